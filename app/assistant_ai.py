@@ -1,12 +1,79 @@
+import functools
 import json
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Tuple
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from json_repair import repair_json
+from urllib3.util.retry import Retry
 
+from .assistant_cache import assistant_cache, normalise
 
-def _fallback_insight(symptoms: str, duration: str) -> Dict[str, str]:
+# Bump whenever the system prompt changes so cached insights are invalidated.
+PROMPT_VERSION = "1"
+_SYSTEM = (
+    "You are a clinical support assistant for skin concerns. "
+    "You do not diagnose; you provide possible explanations, seriousness level, "
+    "red flags, self-care, and next steps. Keep it concise and safe. "
+    "Return STRICT JSON with keys: summary, seriousness, next_steps, red_flags, self_care, follow_up_questions. "
+    "Use double quotes, no trailing commas, and use \\n for line breaks inside strings."
+)
+
+
+def _gemini_endpoint(model: str) -> str:
+    if model.startswith("models/"):
+        model = model.split("/", 1)[1]
+    return f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+
+
+# Read once at import; API keys are still looked up per call so they can rotate.
+_GROQ_MODEL = os.getenv("GROQ_MODEL", "openai/gpt-oss-120b")
+_GROQ_ENDPOINT = f"{os.getenv('GROQ_API_BASE', 'https://api.groq.com/openai/v1')}/chat/completions"
+_GEMINI_ENDPOINT = _gemini_endpoint(os.getenv("GEMINI_MODEL", "gemini-1.5-flash"))
+_GEMINI_MODELS_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+# Static parts of each request body; only the user message varies per call.
+_GROQ_BASE = {
+    "model": _GROQ_MODEL,
+    "messages": [{"role": "system", "content": _SYSTEM}],
+    "temperature": 0.4,
+    "max_tokens": 500,
+    "response_format": {"type": "json_object"},
+}
+_GEMINI_BASE = {
+    "contents": [{"role": "user", "parts": [{"text": _SYSTEM}]}],
+    "generationConfig": {
+        "temperature": 0.4,
+        "maxOutputTokens": 500,
+    },
+}
+
+# One keep-alive pool per host, shared by every request in the process.
+_SESSION = requests.Session()
+_SESSION.headers.update({"Content-Type": "application/json"})
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+    ),
+)
+# When both providers are configured they are raced; the first usable answer wins.
+# A losing call keeps its worker until it times out, so allow two per thread of
+# FastAPI's default 40-thread pool that runs the sync /assistant route.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2 * 40, thread_name_prefix="assistant-llm")
+
+
+_HIGH_RISK_KEYWORDS = ("bleeding", "black", "rapidly growing", "irregular", "ulcer")
+_INFLAMMATORY_KEYWORDS = ("itch", "rash", "dry", "redness", "flaking")
+
+
+@functools.lru_cache(maxsize=1024)
+def _fallback_items(symptoms: str, duration: str) -> Tuple[Tuple[str, str], ...]:
     summary = "We could not interpret the input. Please add more detail."
     seriousness = "Unclear"
     next_steps = "Provide symptom location, onset, and any triggers."
@@ -14,11 +81,11 @@ def _fallback_insight(symptoms: str, duration: str) -> Dict[str, str]:
     self_care = "Keep the area clean and avoid known irritants."
 
     text = f"{symptoms} {duration}".lower()
-    if any(word in text for word in ["bleeding", "black", "rapidly growing", "irregular", "ulcer"]):
+    if any(word in text for word in _HIGH_RISK_KEYWORDS):
         seriousness = "High"
         summary = "Symptoms suggest a potentially serious skin concern."
         next_steps = "Seek dermatologist evaluation soon."
-    elif any(word in text for word in ["itch", "rash", "dry", "redness", "flaking"]):
+    elif any(word in text for word in _INFLAMMATORY_KEYWORDS):
         seriousness = "Moderate"
         summary = "Symptoms align with inflammatory or allergic skin conditions."
         next_steps = "Consider gentle skincare and consult a clinician if persistent."
@@ -27,13 +94,18 @@ def _fallback_insight(symptoms: str, duration: str) -> Dict[str, str]:
         summary = "Symptoms appear mild, but monitor for changes."
         next_steps = "If worsening or persistent, consult a specialist."
 
-    return {
-        "summary": summary,
-        "seriousness": seriousness,
-        "next_steps": next_steps,
-        "red_flags": red_flags,
-        "self_care": self_care,
-    }
+    return (
+        ("summary", summary),
+        ("seriousness", seriousness),
+        ("next_steps", next_steps),
+        ("red_flags", red_flags),
+        ("self_care", self_care),
+    )
+
+
+def _fallback_insight(symptoms: str, duration: str) -> Dict[str, str]:
+    # Cached as an immutable tuple; hand each caller its own dict.
+    return dict(_fallback_items(symptoms, duration))
 
 
 def _parse_model_text(text: str) -> Tuple[Dict[str, str], str | None]:
@@ -59,32 +131,6 @@ def _parse_model_text(text: str) -> Tuple[Dict[str, str], str | None]:
             "follow_up_questions": follow_up,
         }
 
-    def _repair_json(raw: str) -> str:
-        return re.sub(r",\s*([}\]])", r"\1", raw)
-
-    def _escape_newlines_in_strings(raw: str) -> str:
-        out = []
-        in_str = False
-        escape = False
-        for ch in raw:
-            if escape:
-                out.append(ch)
-                escape = False
-                continue
-            if ch == "\\":
-                out.append(ch)
-                escape = True
-                continue
-            if ch == "\"":
-                in_str = not in_str
-                out.append(ch)
-                continue
-            if in_str and ch in ("\n", "\r"):
-                out.append("\\n")
-                continue
-            out.append(ch)
-        return "".join(out)
-
     try:
         obj = json.loads(cleaned)
         if isinstance(obj, dict):
@@ -93,9 +139,9 @@ def _parse_model_text(text: str) -> Tuple[Dict[str, str], str | None]:
         pass
 
     try:
-        maybe_json = cleaned[cleaned.find("{") : cleaned.rfind("}") + 1]
-        maybe_json = _escape_newlines_in_strings(_repair_json(maybe_json))
-        obj = json.loads(maybe_json) if maybe_json else None
+        # Handles trailing commas, raw newlines in strings, truncation and
+        # prose around the object in one pass.
+        obj = repair_json(cleaned, return_objects=True)
         if isinstance(obj, dict):
             return _coerce(obj), None
     except Exception:
@@ -116,35 +162,18 @@ def _parse_model_text(text: str) -> Tuple[Dict[str, str], str | None]:
 
 
 def _call_groq(symptoms: str, duration: str, api_key: str) -> Tuple[Dict[str, str], str | None]:
-    model = os.getenv("GROQ_MODEL", "openai/gpt-oss-120b")
-    base_url = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1")
-    endpoint = f"{base_url}/chat/completions"
-
-    system = (
-        "You are a clinical support assistant for skin concerns. "
-        "You do not diagnose; you provide possible explanations, seriousness level, "
-        "red flags, self-care, and next steps. Keep it concise and safe. "
-        "Return STRICT JSON with keys: summary, seriousness, next_steps, red_flags, self_care, follow_up_questions. "
-        "Use double quotes, no trailing commas, and use \\n for line breaks inside strings."
-    )
     user = f"Symptoms: {symptoms}\nDuration: {duration}".strip()
 
     payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        "temperature": 0.4,
-        "max_tokens": 500,
-        "response_format": {"type": "json_object"},
+        **_GROQ_BASE,
+        "messages": _GROQ_BASE["messages"] + [{"role": "user", "content": user}],
     }
 
     def _post(body: dict):
-        return requests.post(
-            endpoint,
-            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-            json=body,
+        return _SESSION.post(
+            _GROQ_ENDPOINT,
+            headers={"Authorization": f"Bearer {api_key}"},
+            data=orjson.dumps(body),
             timeout=30,
         )
 
@@ -171,37 +200,18 @@ def _call_groq(symptoms: str, duration: str, api_key: str) -> Tuple[Dict[str, st
 
 
 def _call_gemini(symptoms: str, duration: str, api_key: str) -> Tuple[Dict[str, str], str | None]:
-    model = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-    if model.startswith("models/"):
-        model = model.split("/", 1)[1]
-    endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-
-    system = (
-        "You are a clinical support assistant for skin concerns. "
-        "You do not diagnose; you provide possible explanations, seriousness level, "
-        "red flags, self-care, and next steps. Keep it concise and safe. "
-        "Return STRICT JSON with keys: summary, seriousness, next_steps, red_flags, self_care, follow_up_questions. "
-        "Use double quotes, no trailing commas, and use \\n for line breaks inside strings."
-    )
     user = f"Symptoms: {symptoms}\nDuration: {duration}".strip()
 
     payload = {
-        "contents": [
-            {"role": "user", "parts": [{"text": system}]},
-            {"role": "user", "parts": [{"text": user}]},
-        ],
-        "generationConfig": {
-            "temperature": 0.4,
-            "maxOutputTokens": 500,
-        },
+        **_GEMINI_BASE,
+        "contents": _GEMINI_BASE["contents"] + [{"role": "user", "parts": [{"text": user}]}],
     }
 
     def _list_models_error() -> str:
         try:
-            list_url = "https://generativelanguage.googleapis.com/v1beta/models"
-            resp = requests.get(
-                list_url,
-                headers={"x-goog-api-key": api_key, "Content-Type": "application/json"},
+            resp = _SESSION.get(
+                _GEMINI_MODELS_URL,
+                headers={"x-goog-api-key": api_key},
                 timeout=30,
             )
             if resp.status_code != 200:
@@ -214,10 +224,10 @@ def _call_gemini(symptoms: str, duration: str, api_key: str) -> Tuple[Dict[str,
             return "Model not found. Unable to list available models."
 
     try:
-        resp = requests.post(
-            endpoint,
-            headers={"x-goog-api-key": api_key, "Content-Type": "application/json"},
-            json=payload,
+        resp = _SESSION.post(
+            _GEMINI_ENDPOINT,
+            headers={"x-goog-api-key": api_key},
+            data=orjson.dumps(payload),
             timeout=30,
         )
         if resp.status_code == 404:
@@ -244,13 +254,46 @@ def _call_gemini(symptoms: str, duration: str, api_key: str) -> Tuple[Dict[str,
         return _fallback_insight(symptoms, duration), f"Gemini request failed: {exc}"
 
 
+def _cached_call(provider: str, symptoms: str, duration: str, call) -> Tuple[Dict[str, str], str | None]:
+    key = (PROMPT_VERSION, provider, normalise(symptoms), normalise(duration))
+    if not key[2]:
+        return call(symptoms, duration)
+    cached = assistant_cache.get(key)
+    if cached is not None:
+        return cached, None
+    result, err = call(symptoms, duration)
+    # Only cache real model output, never the keyword fallback.
+    if err is None:
+        assistant_cache.put(key, result)
+    return result, err
+
+
+def _race(symptoms: str, duration: str, calls) -> Tuple[Dict[str, str], str | None]:
+    if len(calls) == 1:
+        return calls[0](symptoms, duration)
+    futures = [_EXECUTOR.submit(call, symptoms, duration) for call in calls]
+    for future in as_completed(futures):
+        result, err = future.result()
+        if err is None:
+            for other in futures:
+                other.cancel()
+            return result, None
+    # Every provider failed; report the primary one's error.
+    return futures[0].result()
+
+
 def generate_assistant_insight(symptoms: str, duration: str) -> Tuple[Dict[str, str], str | None]:
     groq_key = os.getenv("GROQ_API_KEY")
-    if groq_key:
-        return _call_groq(symptoms, duration, groq_key)
+    gemini_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
 
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    providers = []
+    if groq_key:
+        providers.append(("groq", lambda s, d: _call_groq(s, d, groq_key)))
+    if gemini_key:
+        providers.append(("gemini", lambda s, d: _call_gemini(s, d, gemini_key)))
+    if not providers:
         return _fallback_insight(symptoms, duration), "GROQ_API_KEY or GEMINI_API_KEY is not set."
 
-    return _call_gemini(symptoms, duration, api_key)
+    name = "+".join(provider for provider, _ in providers)
+    calls = [call for _, call in providers]
+    return _cached_call(name, symptoms, duration, lambda s, d: _race(s, d, calls))
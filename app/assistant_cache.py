@@ -0,0 +1,54 @@
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Hashable, Tuple
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+
+def normalise(text: str) -> str:
+    """Casefold and drop punctuation/extra spaces; every word, in any script, is kept."""
+    # Split on Unicode punctuation, separators and controls rather than \W:
+    # re's \w excludes combining vowel signs, which would mangle Indic words.
+    text = unicodedata.normalize("NFC", text.casefold())
+    return " ".join("".join(" " if unicodedata.category(ch)[0] in "PZC" else ch for ch in text).split())
+
+
+class AssistantCache:
+    """Small in-process TTL/LRU cache of assistant answers, keyed exactly.
+
+    Similarity matching is deliberately avoided: prompts that differ only by
+    a negation ("bleeding" / "not bleeding") need different answers.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            result, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(result)
+
+    def put(self, key: Hashable, result: dict, ttl: float = DEFAULT_TTL) -> None:
+        with self._lock:
+            self._entries[key] = (dict(result), time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+assistant_cache = AssistantCache()
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-image predictions into one model call.
+
+    The first request to arrive opens a batch and flushes it after
+    ``max_wait`` seconds, or immediately once ``max_batch`` images are queued.
+    Inference runs in a worker thread, one batch at a time.
+    """
+
+    def __init__(self, model, max_batch: int = 8, max_wait: float = 0.02):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+        # The loop only keeps weak references to tasks; hold them until done.
+        self._tasks = set()
+
+    async def __call__(self, img):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((img, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif len(self._pending) == 1:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _infer(self, images):
+        with self._lock:
+            return self.model(images, verbose=False)
+
+    async def _run(self, batch) -> None:
+        try:
+            results = await asyncio.to_thread(self._infer, [img for img, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Model returned no result."))
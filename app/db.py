@@ -1,31 +1,61 @@
 import os
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 Base = declarative_base()
 
 
-def _db_url() -> str:
-    db_path = os.getenv("DB_PATH", "app.db")
+def _db_url(db_path: str | None = None) -> str:
+    db_path = db_path or os.getenv("DB_PATH", "app.db")
     return f"sqlite:///{db_path}"
 
 
+def _sqlite_pragmas(dbapi_conn, _connection_record) -> None:
+    # WAL lets readers proceed during writes; NORMAL sync is durable under WAL.
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-20000")
+    cur.execute("PRAGMA mmap_size=268435456")
+    cur.execute("PRAGMA busy_timeout=5000")
+    cur.close()
+
+
+def create_db_engine(db_path: str | None = None, poolclass=None):
+    kwargs = {"poolclass": poolclass} if poolclass is not None else {}
+    engine = create_engine(
+        _db_url(db_path),
+        connect_args={"check_same_thread": False},
+        pool_pre_ping=True,
+        **kwargs,
+    )
+    event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+def create_session_local(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+ENGINE = create_db_engine()
+SessionLocal = create_session_local(ENGINE)
+
+
 def get_engine():
-    return create_engine(_db_url(), connect_args={"check_same_thread": False})
+    return ENGINE
 
 
 def get_session_local():
-    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return SessionLocal
 
 
-def init_db() -> None:
-    engine = get_engine()
-    Base.metadata.create_all(bind=engine)
+def init_db(engine=None) -> None:
+    Base.metadata.create_all(bind=engine or ENGINE)
 
 
 def get_db():
-    SessionLocal = get_session_local()
     db = SessionLocal()
     try:
         yield db
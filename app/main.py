@@ -1,118 +1,162 @@
 import os
-import tempfile
 from pathlib import Path
 
-from fastapi import Depends, FastAPI, File, Form, Request, UploadFile
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Depends, FastAPI, File, Form, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from PIL import Image, UnidentifiedImageError
+import torch
 from ultralytics import YOLO
-from sqlalchemy.orm import Session
 
 APP_ROOT = Path(__file__).resolve().parent
 load_dotenv(APP_ROOT.parent / ".env")
-TEMPLATES = Jinja2Templates(directory=str(APP_ROOT / "templates"))
+TEMPLATES = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader(str(APP_ROOT / "templates")),
+        autoescape=select_autoescape(),
+        # Set TEMPLATE_AUTO_RELOAD=1 while editing templates locally.
+        auto_reload=os.getenv("TEMPLATE_AUTO_RELOAD") == "1",
+        # No directory: Jinja uses a private per-user temp dir it checks itself.
+        bytecode_cache=FileSystemBytecodeCache(),
+    )
+)
+# Shared defaults for every remedy.html render; copy and override per request.
+_REMEDY_CTX = {
+    "result": None,
+    "error": None,
+    "hospitals": None,
+    "primary_disease": None,
+    "feedback_saved": None,
+}
 
 MODEL_PATH = Path(os.getenv("MODEL_PATH", "checkpoints/best.pt"))
+PREDICT_MAX_BATCH = int(os.getenv("PREDICT_MAX_BATCH", "8"))
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "20"))
 
-app = FastAPI(title="Skin Disease Classifier", version="1.0.0")
-app.mount("/static", StaticFiles(directory=str(APP_ROOT / "static")), name="static")
+router = APIRouter()
 
 _model = None
+_batcher = None
 
-from .db import get_db, init_db
+from .db import ENGINE, SessionLocal, create_db_engine, create_session_local, init_db
 from .models import Feedback
 from .assistant_ai import generate_assistant_insight
+from .batcher import MicroBatcher
+from .onnx_model import OnnxClassifier
 from .recommendations import fetch_practo_clinics, get_city_specialists, get_hospitals
 
 
-@app.on_event("startup")
 def _load_model() -> None:
     global _model
-    init_db()
     if os.getenv("SKIP_MODEL_LOAD") == "1":
         return
     if not MODEL_PATH.exists():
         raise FileNotFoundError(
             f"Model not found at {MODEL_PATH}. Set MODEL_PATH or place best.pt in checkpoints/."
         )
-    _model = YOLO(str(MODEL_PATH))
+    if MODEL_PATH.suffix == ".onnx":
+        _model = OnnxClassifier(MODEL_PATH)
+    else:
+        _model = YOLO(str(MODEL_PATH))
+
+
+def create_app(db_path: str | None = None, poolclass=None) -> FastAPI:
+    """Build an app; pass ``db_path`` to give it its own SQLite database."""
+    if db_path is None:
+        engine, session_factory = ENGINE, SessionLocal
+    else:
+        engine = create_db_engine(db_path, poolclass=poolclass)
+        session_factory = create_session_local(engine)
+
+    app = FastAPI(
+        title="Skin Disease Classifier",
+        version="1.0.0",
+        default_response_class=ORJSONResponse,
+    )
+    app.mount("/static", StaticFiles(directory=str(APP_ROOT / "static")), name="static")
+    app.state.engine = engine
+    app.state.session_factory = session_factory
+
+    @app.on_event("startup")
+    def _startup() -> None:
+        init_db(engine)
+        _load_model()
+
+    app.include_router(router)
+    return app
+
+
+def _decode_image(file) -> Image.Image:
+    return Image.open(file).convert("RGB")
+
+
+def get_model():
+    return _model
+
+
+def _get_batcher(model) -> MicroBatcher:
+    global _batcher
+    if _batcher is None or _batcher.model is not model:
+        _batcher = MicroBatcher(
+            model,
+            max_batch=PREDICT_MAX_BATCH,
+            max_wait=PREDICT_MAX_WAIT_MS / 1000,
+        )
+    return _batcher
 
 
-@app.get("/", response_class=HTMLResponse)
+@router.get("/", response_class=HTMLResponse)
 def index():
     return RedirectResponse(url="/remedy", status_code=303)
 
 
-@app.get("/remedy", response_class=HTMLResponse)
+@router.get("/remedy", response_class=HTMLResponse)
 def remedy_page(request: Request):
-    return TEMPLATES.TemplateResponse(
-        "remedy.html",
-        {
-            "request": request,
-            "result": None,
-            "error": None,
-            "hospitals": None,
-            "primary_disease": None,
-            "feedback_saved": None,
-        },
-    )
+    return TEMPLATES.TemplateResponse("remedy.html", dict(_REMEDY_CTX, request=request))
 
 
-@app.get("/health")
+@router.get("/health")
 def health():
     return {"status": "ok"}
 
 
-@app.post("/predict", response_class=HTMLResponse)
+@router.post("/predict", response_class=HTMLResponse)
 async def predict(
     request: Request,
     image: UploadFile = File(...),
     top_k: int = Form(3),
+    model=Depends(get_model),
 ):
     if not image.content_type or not image.content_type.startswith("image/"):
         return TEMPLATES.TemplateResponse(
             "remedy.html",
-            {
-                "request": request,
-                "result": None,
-                "error": "Please upload a valid image file.",
-                "hospitals": None,
-                "primary_disease": None,
-                "feedback_saved": None,
-            },
+            dict(_REMEDY_CTX, request=request, error="Please upload a valid image file."),
             status_code=400,
         )
 
-    tmp_path = None
     filename = image.filename or ""
     try:
-        contents = await image.read()
-        if not contents:
+        # Decode straight from the spooled upload; no temp file round-trip.
+        if image.file.seek(0, os.SEEK_END) == 0:
             raise ValueError("Empty file.")
+        image.file.seek(0)
+        if os.getenv("SKIP_IMAGE_DECODE") == "1":
+            # Test hook: the stub model ignores pixels, so skip the decode.
+            img = image.file
+        else:
+            # Full decode of a large upload would block the event loop.
+            img = await run_in_threadpool(_decode_image, image.file)
 
-        suffix = Path(image.filename).suffix if image.filename else ""
-        if not suffix and image.content_type:
-            if image.content_type == "image/jpeg":
-                suffix = ".jpg"
-            elif image.content_type == "image/png":
-                suffix = ".png"
-            elif image.content_type == "image/webp":
-                suffix = ".webp"
-        if not suffix:
-            suffix = ".jpg"
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
-
-        if _model is None:
+        if model is None:
             raise RuntimeError("Model not loaded.")
 
-        results = _model(tmp_path, verbose=False)[0]
+        results = await _get_batcher(model)(img)
         probs = results.probs
-        names = _model.names
+        names = model.names
 
         top_k = max(1, min(int(top_k), len(names)))
 
@@ -120,18 +164,10 @@ async def predict(
             top_indices = list(probs.top5)[:top_k]
             top_scores = list(probs.top5conf)[:top_k]
         else:
-            # Fallback for k > 5 using raw probability tensor
-            arr = probs.data
-            try:
-                import numpy as np
-
-                arr = arr.detach().cpu().numpy() if hasattr(arr, "detach") else np.array(arr)
-                top_indices = np.argsort(arr)[::-1][:top_k].tolist()
-                top_scores = arr[top_indices].tolist()
-            except Exception:
-                # Safe fallback to top5 if numpy/torch is unavailable
-                top_indices = list(probs.top5)[:5]
-                top_scores = list(probs.top5conf)[:5]
+            # k > 5: select on the raw probability tensor instead of sorting it
+            top_scores, top_indices = torch.topk(torch.as_tensor(probs.data), k=top_k)
+            top_indices = top_indices.tolist()
+            top_scores = top_scores.tolist()
 
         predictions = []
         for idx, score in zip(top_indices, top_scores):
@@ -141,51 +177,46 @@ async def predict(
                     "confidence": float(score),
                 }
             )
+    except UnidentifiedImageError:
+        return TEMPLATES.TemplateResponse(
+            "remedy.html",
+            dict(
+                _REMEDY_CTX,
+                request=request,
+                error="Could not read the uploaded image. Please upload a valid image file.",
+            ),
+            status_code=400,
+        )
     except Exception as exc:
         return TEMPLATES.TemplateResponse(
             "remedy.html",
-            {
-                "request": request,
-                "result": None,
-                "error": f"Prediction failed: {exc}",
-                "hospitals": None,
-                "primary_disease": None,
-                "feedback_saved": None,
-            },
+            dict(_REMEDY_CTX, request=request, error=f"Prediction failed: {exc}"),
             status_code=500,
         )
-    finally:
-        if tmp_path:
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
 
     primary_disease = predictions[0]["label"] if predictions else None
     hospitals = get_hospitals(primary_disease) if primary_disease else None
 
     return TEMPLATES.TemplateResponse(
         "remedy.html",
-        {
-            "request": request,
-            "result": predictions,
-            "error": None,
-            "hospitals": hospitals,
-            "primary_disease": primary_disease,
-            "feedback_saved": None,
-            "upload_name": filename,
-        },
+        dict(
+            _REMEDY_CTX,
+            request=request,
+            result=predictions,
+            hospitals=hospitals,
+            primary_disease=primary_disease,
+            upload_name=filename,
+        ),
     )
 
 
-@app.post("/feedback", response_class=HTMLResponse)
+@router.post("/feedback", response_class=HTMLResponse)
 def submit_feedback(
     request: Request,
     disease: str = Form(...),
     rating: int = Form(...),
     comments: str = Form(""),
     email: str = Form(""),
-    db: Session = Depends(get_db),
 ):
     rating = max(1, min(int(rating), 5))
     feedback = Feedback(
@@ -194,22 +225,16 @@ def submit_feedback(
         comments=comments.strip() or None,
         email=email.strip() or None,
     )
-    db.add(feedback)
-    db.commit()
+    with request.app.state.session_factory() as db:
+        db.add(feedback)
+        db.commit()
     return TEMPLATES.TemplateResponse(
         "remedy.html",
-        {
-            "request": request,
-            "result": None,
-            "error": None,
-            "hospitals": None,
-            "feedback_saved": True,
-            "primary_disease": None,
-        },
+        dict(_REMEDY_CTX, request=request, feedback_saved=True),
     )
 
 
-@app.get("/assistant", response_class=HTMLResponse)
+@router.get("/assistant", response_class=HTMLResponse)
 def assistant_page(request: Request):
     return TEMPLATES.TemplateResponse(
         "assistant.html",
@@ -220,7 +245,7 @@ def assistant_page(request: Request):
     )
 
 
-@app.post("/assistant", response_class=HTMLResponse)
+@router.post("/assistant", response_class=HTMLResponse)
 def assistant(
     request: Request,
     symptoms: str = Form(...),
@@ -238,7 +263,7 @@ def assistant(
     )
 
 
-@app.get("/specialist", response_class=HTMLResponse)
+@router.get("/specialist", response_class=HTMLResponse)
 def specialist_page(request: Request, disease: str = "", location: str = ""):
     disease = disease.strip()
     location = location.strip()
@@ -259,7 +284,7 @@ def specialist_page(request: Request, disease: str = "", location: str = ""):
     )
 
 
-@app.post("/specialist", response_class=HTMLResponse)
+@router.post("/specialist", response_class=HTMLResponse)
 def specialist_submit(request: Request, disease: str = Form(""), location: str = Form("")):
     disease = disease.strip()
     location = location.strip()
@@ -278,3 +303,6 @@ def specialist_submit(request: Request, disease: str = Form(""), location: str =
             "city_specialists": city_specialists,
         },
     )
+
+
+app = create_app()
@@ -0,0 +1,94 @@
+import ast
+import json
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL import Image
+
+
+class OnnxProbs:
+    def __init__(self, data: torch.Tensor):
+        self.data = data
+        top5conf, top5 = torch.topk(data, k=min(5, data.numel()))
+        self.top5 = top5.tolist()
+        self.top5conf = top5conf.tolist()
+
+
+class OnnxResult:
+    def __init__(self, data: torch.Tensor):
+        self.probs = OnnxProbs(data)
+
+
+class OnnxClassifier:
+    """onnxruntime stand-in for the parts of ``YOLO`` the routes use."""
+
+    def __init__(self, model_path: Path):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        # Full fusion also folds int8 QDQ pairs into VNNI kernels where supported.
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=_providers(ort.get_available_providers()),
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.imgsz = input_size(self.session)
+        # Static exports have a fixed batch of 1; dynamic ones take any size.
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.names = _load_names(model_path, self.session)
+
+    def __call__(self, source, verbose=False):
+        sources = source if isinstance(source, (list, tuple)) else [source]
+        tensors = [self._load(item) for item in sources]
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: np.concatenate(tensors)})[0]
+        else:
+            outputs = np.concatenate(
+                [self.session.run(None, {self.input_name: tensor})[0] for tensor in tensors]
+            )
+        return [OnnxResult(torch.from_numpy(row)) for row in outputs]
+
+    def _load(self, source) -> np.ndarray:
+        if not isinstance(source, Image.Image):
+            source = Image.open(source)
+        return preprocess(source.convert("RGB"), self.imgsz)
+
+
+def _providers(available):
+    if "CUDAExecutionProvider" in available:
+        return ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    return ["CPUExecutionProvider"]
+
+
+def input_size(session) -> int:
+    width = session.get_inputs()[0].shape[-1]
+    if isinstance(width, int):
+        return width
+    # Dynamic exports name the spatial axes; ultralytics records imgsz in metadata.
+    return int(ast.literal_eval(session.get_modelmeta().custom_metadata_map["imgsz"])[-1])
+
+
+def _load_names(model_path: Path, session) -> dict:
+    names_path = model_path.with_name("names.json")
+    if names_path.exists():
+        names = json.loads(names_path.read_text(encoding="utf-8"))
+    else:
+        # ultralytics embeds the class map in the ONNX metadata as a dict repr
+        names = ast.literal_eval(session.get_modelmeta().custom_metadata_map["names"])
+    return {int(k): v for k, v in names.items()}
+
+
+def preprocess(img: Image.Image, size: int) -> np.ndarray:
+    # Same as ultralytics classify_transforms: short-side resize, centre crop, /255.
+    width, height = img.size
+    scale = size / min(width, height)
+    img = img.resize((round(width * scale), round(height * scale)), Image.BILINEAR)
+    left = (img.width - size) // 2
+    top = (img.height - size) // 2
+    img = img.crop((left, top, left + size, top + size))
+    arr = np.asarray(img, dtype=np.float32) / 255.0
+    return np.ascontiguousarray(arr.transpose(2, 0, 1)[None])
@@ -1,8 +1,20 @@
+import functools
 import os
-from typing import List, Tuple
+import threading
+import time
+from typing import Dict, List, Tuple
 
 import requests
 
+PRACTO_CACHE_TTL = 600
+PRACTO_ERROR_TTL = 60
+PRACTO_CACHE_MAXSIZE = 512
+
+_PRACTO_SESSION = requests.Session()
+_practo_cache: Dict[str, Tuple[float, Tuple[List[dict], str | None]]] = {}
+_practo_locks: Dict[str, threading.Lock] = {}
+_practo_guard = threading.Lock()
+
 DEFAULT_HOSPITALS = [
     {
         "name": "Central Dermatology Center",
@@ -68,8 +80,42 @@ def build_practo_skin_clinics_url(location: str) -> str:
     return f"{base}/{slug}/clinics/skin-clinics"
 
 
+def _cached_practo(url: str):
+    entry = _practo_cache.get(url)
+    if entry is None:
+        return None
+    expires_at, result = entry
+    if expires_at <= time.monotonic():
+        return None
+    return result
+
+
 def fetch_practo_clinics(location: str) -> Tuple[List[dict], str | None]:
+    # Keyed by the listing URL, which already normalises case and spacing.
     url = build_practo_skin_clinics_url(location)
+    result = _cached_practo(url)
+    if result is not None:
+        return result
+
+    # Single-flight: concurrent misses for one city share one upstream call.
+    with _practo_guard:
+        lock = _practo_locks.setdefault(url, threading.Lock())
+    with lock:
+        result = _cached_practo(url)
+        if result is not None:
+            return result
+        result = _fetch_practo_clinics(url, location)
+        # Failures are usually transient (blocking, timeouts); retry them sooner.
+        ttl = PRACTO_CACHE_TTL if result[1] is None else PRACTO_ERROR_TTL
+        with _practo_guard:
+            if len(_practo_cache) >= PRACTO_CACHE_MAXSIZE:
+                _practo_cache.pop(next(iter(_practo_cache)))
+            _practo_cache[url] = (time.monotonic() + ttl, result)
+            _practo_locks.pop(url, None)
+        return result
+
+
+def _fetch_practo_clinics(url: str, location: str) -> Tuple[List[dict], str | None]:
     user_agent = os.getenv(
         "PRACTO_USER_AGENT",
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -85,7 +131,7 @@ def fetch_practo_clinics(location: str) -> Tuple[List[dict], str | None]:
         headers["Cookie"] = cookie
 
     try:
-        resp = requests.get(url, headers=headers, timeout=20)
+        resp = _PRACTO_SESSION.get(url, headers=headers, timeout=20)
         if resp.status_code != 200:
             return [], f"Practo responded with status {resp.status_code}."
 
@@ -165,12 +211,13 @@ def get_top_cities_specialists():
     return data
 
 
+@functools.lru_cache(maxsize=None)
+def _specialists_by_city():
+    # Built once; lookups are then a single dict hit per request.
+    return {city.lower(): specialists for city, specialists in get_top_cities_specialists().items()}
+
+
 def get_city_specialists(city: str):
     if not city:
         return []
-    data = get_top_cities_specialists()
-    key = city.strip().lower()
-    for city_name, specialists in data.items():
-        if city_name.lower() == key:
-            return specialists
-    return []
+    return _specialists_by_city().get(city.strip().lower(), [])
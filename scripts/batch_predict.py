@@ -1,6 +1,7 @@
 import argparse
 from pathlib import Path
 
+import torch
 from ultralytics import YOLO
 
 
@@ -53,16 +54,9 @@ def main():
             top_indices = list(res.probs.top5)[:top_k]
             top_scores = list(res.probs.top5conf)[:top_k]
         else:
-            arr = res.probs.data
-            try:
-                import numpy as np
-
-                arr = arr.detach().cpu().numpy() if hasattr(arr, "detach") else np.array(arr)
-                top_indices = np.argsort(arr)[::-1][:top_k].tolist()
-                top_scores = arr[top_indices].tolist()
-            except Exception:
-                top_indices = list(res.probs.top5)[:5]
-                top_scores = list(res.probs.top5conf)[:5]
+            top_scores, top_indices = torch.topk(torch.as_tensor(res.probs.data), k=top_k)
+            top_indices = top_indices.tolist()
+            top_scores = top_scores.tolist()
         print(f"\n{img.name}")
         for idx, score in zip(top_indices, top_scores):
             label = names[int(idx)]
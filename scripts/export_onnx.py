@@ -0,0 +1,47 @@
+import argparse
+import json
+from pathlib import Path
+
+from ultralytics import YOLO
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export the YOLOv8 classifier to ONNX for serving.")
+    parser.add_argument(
+        "--model",
+        default="checkpoints/best.pt",
+        help="Path to model weights.",
+    )
+    parser.add_argument(
+        "--imgsz",
+        type=int,
+        default=224,
+        help="Input image size used during training.",
+    )
+    parser.add_argument(
+        "--dynamic",
+        action="store_true",
+        help="Export with a dynamic batch axis so the app can micro-batch requests.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    model_path = Path(args.model)
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model not found: {model_path}")
+
+    model = YOLO(str(model_path))
+    onnx_path = Path(model.export(format="onnx", dynamic=args.dynamic, imgsz=args.imgsz))
+
+    names_path = onnx_path.with_name("names.json")
+    names_path.write_text(json.dumps(model.names, indent=2), encoding="utf-8")
+
+    print(f"Exported {onnx_path}")
+    print(f"Wrote {names_path}")
+    print(f"Serve it with MODEL_PATH={onnx_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import sys
+from pathlib import Path
+
+import onnxruntime as ort
+from PIL import Image
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.onnx_model import input_size, preprocess
+
+
+class ImageFolderReader(CalibrationDataReader):
+    def __init__(self, model_path: Path, input_dir: Path):
+        session = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+        self.input_name = session.get_inputs()[0].name
+        self.imgsz = input_size(session)
+        self.images = iter(
+            sorted(
+                p for p in input_dir.iterdir() if p.suffix.lower() in {".jpg", ".jpeg", ".png", ".webp"}
+            )
+        )
+
+    def get_next(self):
+        path = next(self.images, None)
+        if path is None:
+            return None
+        img = Image.open(path).convert("RGB")
+        return {self.input_name: preprocess(img, self.imgsz)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Quantize the exported ONNX classifier to int8.")
+    parser.add_argument(
+        "--model",
+        default="checkpoints/best.onnx",
+        help="Path to the FP32 ONNX model.",
+    )
+    parser.add_argument(
+        "--calib",
+        default="input_images",
+        help="Folder with calibration images (a few dozen representative photos).",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Output path. Defaults to <model>_int8.onnx.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    model_path = Path(args.model)
+    calib_dir = Path(args.calib)
+
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model not found: {model_path}")
+    if not calib_dir.exists():
+        raise FileNotFoundError(f"Calibration folder not found: {calib_dir}")
+
+    output = Path(args.output) if args.output else model_path.with_name(f"{model_path.stem}_int8.onnx")
+    quantize_static(
+        str(model_path),
+        str(output),
+        ImageFolderReader(model_path, calib_dir),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+    )
+
+    names_path = model_path.with_name("names.json")
+    if names_path.exists() and output.parent != model_path.parent:
+        (output.parent / "names.json").write_text(names_path.read_text(encoding="utf-8"), encoding="utf-8")
+
+    print(f"Wrote {output}")
+    print(f"Serve it with MODEL_PATH={output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,3 +4,39 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+class DummyProbs:
+    def __init__(self):
+        self._indices = [0, 1, 2]
+        self._values = [0.7, 0.2, 0.1]
+
+    @property
+    def top5(self):
+        return self._indices
+
+    @property
+    def top5conf(self):
+        return self._values
+
+
+class DummyResult:
+    def __init__(self):
+        self.probs = DummyProbs()
+
+
+class DummyModel:
+    def __init__(self):
+        self.names = {0: "Acne", 1: "Eczema", 2: "Melanoma"}
+
+    def __call__(self, images, verbose=False):
+        return [DummyResult() for _ in images]
+
+
+# 1x1 24-bit BMP (one (200, 120, 80) pixel), stored as a literal so the
+# tests never encode an image.
+IMG_BYTES = (
+    b"BM:\x00\x00\x00\x00\x00\x00\x006\x00\x00\x00(\x00\x00\x00\x01\x00\x00\x00"
+    b"\x01\x00\x00\x00\x01\x00\x18\x00\x00\x00\x00\x00\x04\x00\x00\x00\x13\x0b"
+    b"\x00\x00\x13\x0b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00Px\xc8\x00"
+)
@@ -1,106 +1,130 @@
-import io
 import importlib
+import os
 
 import pytest
 from fastapi.testclient import TestClient
-from PIL import Image
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import SingletonThreadPool
 
+from conftest import IMG_BYTES, DummyModel
 
-class DummyProbs:
-    def __init__(self):
-        self._indices = [0, 1, 2]
-        self._values = [0.7, 0.2, 0.1]
 
-    @property
-    def top5(self):
-        return self._indices
+_DUMMY = DummyModel()
 
-    @property
-    def top5conf(self):
-        return self._values
 
+@pytest.fixture(scope="session")
+def app_module():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("SKIP_MODEL_LOAD", "1")
+        mp.setenv("SKIP_IMAGE_DECODE", "1")
+        yield importlib.import_module("app.main")
 
-class DummyResult:
-    def __init__(self):
-        self.probs = DummyProbs()
 
+def _no_driver_transactions(dbapi_conn, _connection_record):
+    dbapi_conn.isolation_level = None
 
-class DummyModel:
-    def __init__(self):
-        self.names = {0: "Acne", 1: "Eczema", 2: "Melanoma"}
 
-    def __call__(self, path, verbose=False):
-        return [DummyResult()]
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
 
 
-@pytest.fixture(autouse=True)
-def _inject_dummy_model(monkeypatch):
-    monkeypatch.setenv("SKIP_MODEL_LOAD", "1")
-    import app.main as app_module
-    importlib.reload(app_module)
-    app_module._model = DummyModel()
-    yield app_module
+@pytest.fixture(scope="session")
+def app(app_module):
+    # Shared-cache in-memory SQLite: one schema for the session, no files.
+    # Named per xdist worker so parallel runs never share a database.
+    # SingletonThreadPool is pinned explicitly; SQLAlchemy is deprecating
+    # inferring it from mode=memory.
+    worker_id = os.getenv("PYTEST_XDIST_WORKER", "master")
+    app = app_module.create_app(
+        db_path=f"file:skindx_{worker_id}?mode=memory&cache=shared&uri=true",
+        poolclass=SingletonThreadPool,
+    )
+    # pysqlite's own transaction handling ignores BEGIN/SAVEPOINT from the
+    # outside, so the rollback in db_session would not undo app commits.
+    # SQLAlchemy's documented fix: disable it and emit BEGIN ourselves.
+    event.listen(app.state.engine, "connect", _no_driver_transactions)
+    event.listen(app.state.engine, "begin", _emit_begin)
+    app.dependency_overrides[app_module.get_model] = lambda: _DUMMY
+    return app
 
 
-def _make_image_bytes():
-    img = Image.new("RGB", (32, 32), color=(200, 120, 80))
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+@pytest.fixture(scope="session")
+def client(app):
+    # Entering the client runs the startup hook (init_db) once for the session.
+    with TestClient(app) as test_client:
+        yield test_client
 
 
-def test_index_ok(_inject_dummy_model):
-    client = TestClient(_inject_dummy_model.app, follow_redirects=False)
-    res = client.get("/")
+@pytest.fixture(autouse=True)
+def db_session(app, client, monkeypatch):
+    # Every test runs inside one outer transaction that is rolled back on
+    # teardown; app commits become SAVEPOINT releases inside it.
+    connection = app.state.engine.connect()
+    trans = connection.begin()
+    TestSession = sessionmaker(bind=connection, join_transaction_mode="create_savepoint")
+    monkeypatch.setattr(app.state, "session_factory", TestSession)
+    yield TestSession
+    trans.rollback()
+    connection.close()
+
+
+def test_index_ok(client):
+    res = client.get("/", follow_redirects=False)
     assert res.status_code == 303
     assert res.headers["location"] == "/remedy"
 
 
-def test_health_ok(_inject_dummy_model):
-    client = TestClient(_inject_dummy_model.app)
+def test_health_ok(client):
     res = client.get("/health")
     assert res.status_code == 200
     assert res.json() == {"status": "ok"}
 
 
-def test_predict_ok(_inject_dummy_model):
-    client = TestClient(_inject_dummy_model.app)
-    img_bytes = _make_image_bytes()
-    files = {"image": ("test.png", img_bytes, "image/png")}
+def test_predict_ok(client):
+    files = {"image": ("test.bmp", IMG_BYTES, "image/bmp")}
     res = client.post("/predict", files=files, data={"top_k": "2"})
     assert res.status_code == 200
     assert "Prediction Results" in res.text
     assert "Acne" in res.text
 
 
-def test_feedback_saved(_inject_dummy_model):
-    client = TestClient(_inject_dummy_model.app)
+# Run twice: the second run only sees one row if the first was rolled back.
+@pytest.mark.parametrize("run", [1, 2])
+def test_feedback_saved(client, db_session, app_module, run):
     res = client.post(
         "/feedback",
         data={"disease": "Acne", "rating": "4", "comments": "Helpful", "email": "a@b.com"},
     )
     assert res.status_code == 200
     assert "feedback was saved" in res.text.lower()
+    with db_session() as db:
+        assert db.query(app_module.Feedback).count() == 1
 
 
-def test_predict_rejects_non_image(_inject_dummy_model):
-    client = TestClient(_inject_dummy_model.app)
+def test_predict_rejects_non_image(client):
     files = {"image": ("test.txt", b"not an image", "text/plain")}
     res = client.post("/predict", files=files, data={"top_k": "2"})
     assert res.status_code == 400
     assert "valid image" in res.text
 
 
-def test_predict_rejects_empty_file(_inject_dummy_model):
-    client = TestClient(_inject_dummy_model.app)
+def test_predict_rejects_corrupt_image(client, monkeypatch):
+    monkeypatch.delenv("SKIP_IMAGE_DECODE")
+    files = {"image": ("broken.png", b"\x89PNG not really", "image/png")}
+    res = client.post("/predict", files=files, data={"top_k": "2"})
+    assert res.status_code == 400
+    assert "Could not read the uploaded image" in res.text
+
+
+def test_predict_rejects_empty_file(client):
     files = {"image": ("empty.png", b"", "image/png")}
     res = client.post("/predict", files=files, data={"top_k": "2"})
     assert res.status_code == 500
     assert "Empty file" in res.text
 
 
-def test_assistant_page_and_post(_inject_dummy_model):
-    client = TestClient(_inject_dummy_model.app)
+def test_assistant_page_and_post(client):
     res = client.get("/assistant")
     assert res.status_code == 200
     assert "AI Health Assistant" in res.text
@@ -109,10 +133,8 @@ def test_assistant_page_and_post(_inject_dummy_model):
     assert "Assistant Insight" in res.text
 
 
-def test_specialist_page_and_post(_inject_dummy_model):
-    import os
+def test_specialist_page_and_post(client):
     os.environ["PRACTO_PROVIDER"] = "stub"
-    client = TestClient(_inject_dummy_model.app)
     res = client.get("/specialist")
     assert res.status_code == 200
     assert "Find Specialist" in res.text
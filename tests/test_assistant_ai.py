@@ -1,6 +1,23 @@
-import os
+import json
+from unittest import mock
 
-from app.assistant_ai import generate_assistant_insight
+import pytest
+
+from app.assistant_ai import _gemini_endpoint, generate_assistant_insight
+from app.assistant_cache import assistant_cache
+
+_JSON_BODY = (
+    '{'
+    '"summary":"ok",'
+    '"seriousness":"Low",'
+    '"next_steps":"n/a",'
+    '"red_flags":"n/a",'
+    '"self_care":"n/a",'
+    '"follow_up_questions":[]'
+    '}'
+)
+_GEMINI_OK = {"candidates": [{"content": {"parts": [{"text": _JSON_BODY}]}}]}
+_GROQ_OK = {"choices": [{"message": {"content": _JSON_BODY}}]}
 
 
 class _Resp:
@@ -13,84 +30,108 @@ class _Resp:
         return self._data
 
 
+class _Dispatcher:
+    """Stands in for ``_SESSION.post``; answers by provider URL and records calls."""
+
+    def __init__(self):
+        self.calls = []
+        self.status = {}
+
+    def reset(self):
+        self.calls.clear()
+        self.status.clear()
+
+    def __call__(self, url, headers=None, data=None, timeout=30):
+        self.calls.append({"url": url, "headers": headers or {}, "data": data})
+        if url.endswith("/chat/completions"):
+            return _Resp(self.status.get("groq", 200), _GROQ_OK)
+        return _Resp(self.status.get("gemini", 200), _GEMINI_OK)
+
+
+_dispatcher = _Dispatcher()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _patch_requests():
+    # Installed once; also guarantees no test can reach a real provider.
+    with mock.patch("app.assistant_ai._SESSION.post", new=_dispatcher) as patched:
+        yield patched
+
+
+@pytest.fixture(autouse=True)
+def _reset_state(monkeypatch):
+    for key in ("GROQ_API_KEY", "GEMINI_API_KEY", "GOOGLE_API_KEY"):
+        monkeypatch.delenv(key, raising=False)
+    _dispatcher.reset()
+    assistant_cache.clear()
+    yield
+    assistant_cache.clear()
+
+
 def test_generate_assistant_insight_strips_models_prefix(monkeypatch):
-    monkeypatch.delenv("GROQ_API_KEY", raising=False)
     monkeypatch.setenv("GEMINI_API_KEY", "test-key")
-    monkeypatch.setenv("GEMINI_MODEL", "models/gemini-2.0-flash")
-
-    seen = {}
-
-    def _fake_post(url, headers=None, json=None, timeout=30):
-        seen["url"] = url
-        return _Resp(
-            200,
-            {
-                "candidates": [
-                    {
-                        "content": {
-                            "parts": [
-                                {
-                                    "text": (
-                                        '{'
-                                        '"summary":"ok",'
-                                        '"seriousness":"Low",'
-                                        '"next_steps":"n/a",'
-                                        '"red_flags":"n/a",'
-                                        '"self_care":"n/a",'
-                                        '"follow_up_questions":[]'
-                                        '}'
-                                    )
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-        )
-
-    monkeypatch.setattr("app.assistant_ai.requests.post", _fake_post)
+    monkeypatch.setattr(
+        "app.assistant_ai._GEMINI_ENDPOINT", _gemini_endpoint("models/gemini-2.0-flash")
+    )
 
     result, err = generate_assistant_insight("itch", "1 day")
     assert err is None
-    assert "models/gemini-2.0-flash:generateContent" in seen["url"]
+    assert "models/gemini-2.0-flash:generateContent" in _dispatcher.calls[0]["url"]
     assert result["summary"] == "ok"
 
 
 def test_generate_assistant_insight_uses_groq_when_key_present(monkeypatch):
     monkeypatch.setenv("GROQ_API_KEY", "test-groq")
-    monkeypatch.setenv("GROQ_MODEL", "openai/gpt-oss-120b")
-
-    seen = {}
-
-    def _fake_post(url, headers=None, json=None, timeout=30):
-        seen["url"] = url
-        seen["auth"] = headers.get("Authorization") if headers else None
-        return _Resp(
-            200,
-            {
-                "choices": [
-                    {
-                        "message": {
-                            "content": (
-                                "{"
-                                "\"summary\":\"ok\","
-                                "\"seriousness\":\"Low\","
-                                "\"next_steps\":\"n/a\","
-                                "\"red_flags\":\"n/a\","
-                                "\"self_care\":\"n/a\","
-                                "\"follow_up_questions\":[]"
-                                "}"
-                            )
-                        }
-                    }
-                ]
-            },
-        )
-
-    monkeypatch.setattr("app.assistant_ai.requests.post", _fake_post)
 
     result, err = generate_assistant_insight("itch", "1 day")
     assert err is None
-    assert seen["url"].endswith("/chat/completions")
-    assert seen["auth"] == "Bearer test-groq"
+    call = _dispatcher.calls[0]
+    assert call["url"].endswith("/chat/completions")
+    assert call["headers"]["Authorization"] == "Bearer test-groq"
+    messages = json.loads(call["data"])["messages"]
+    assert [m["role"] for m in messages] == ["system", "user"]
+    assert messages[1]["content"] == "Symptoms: itch\nDuration: 1 day"
+    assert result["summary"] == "ok"
+
+
+def test_generate_assistant_insight_reuses_cached_answer(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-groq")
+
+    first, err = generate_assistant_insight("Itchy red rash on my arm", "2 weeks")
+    assert err is None
+    second, err = generate_assistant_insight("itchy red rash on my arm.", "2 weeks")
+    assert err is None
+    assert len(_dispatcher.calls) == 1
+    assert second == first
+
+    generate_assistant_insight("dark mole that is bleeding", "1 month")
+    assert len(_dispatcher.calls) == 2
+
+
+def test_generate_assistant_insight_negation_misses_cache(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-groq")
+
+    generate_assistant_insight("mole changed colour and is bleeding", "2 weeks")
+    generate_assistant_insight("mole changed colour and is not bleeding", "2 weeks")
+    assert len(_dispatcher.calls) == 2
+
+
+def test_generate_assistant_insight_keys_non_latin_text(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-groq")
+
+    generate_assistant_insight("त्वचा पर खुजली", "2 weeks")
+    generate_assistant_insight("काला तिल से खून बह रहा है", "2 weeks")
+    assert len(_dispatcher.calls) == 2
+
+
+def test_generate_assistant_insight_races_providers(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-groq")
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    _dispatcher.status["groq"] = 500
+
+    result, err = generate_assistant_insight("itch", "1 day")
+    assert err is None
     assert result["summary"] == "ok"
+    urls = [call["url"] for call in _dispatcher.calls]
+    assert any(url.endswith("/chat/completions") for url in urls)
+    assert any(url.endswith(":generateContent") for url in urls)
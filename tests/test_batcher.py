@@ -0,0 +1,49 @@
+import asyncio
+
+from app.batcher import MicroBatcher
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, images, verbose=False):
+        self.calls.append(list(images))
+        return [f"result-{img}" for img in images]
+
+
+def test_concurrent_requests_share_one_model_call():
+    model = CountingModel()
+    batcher = MicroBatcher(model, max_batch=8, max_wait=0.05)
+
+    async def _run():
+        return await asyncio.gather(*(batcher(i) for i in range(3)))
+
+    results = asyncio.run(_run())
+    assert results == ["result-0", "result-1", "result-2"]
+    assert model.calls == [[0, 1, 2]]
+
+
+def test_full_batch_flushes_without_waiting():
+    model = CountingModel()
+    batcher = MicroBatcher(model, max_batch=2, max_wait=10)
+
+    async def _run():
+        return await asyncio.wait_for(asyncio.gather(batcher("a"), batcher("b")), timeout=2)
+
+    assert asyncio.run(_run()) == ["result-a", "result-b"]
+    assert model.calls == [["a", "b"]]
+
+
+def test_model_error_reaches_every_waiter():
+    def broken(images, verbose=False):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(broken, max_batch=8, max_wait=0.01)
+
+    async def _run():
+        return await asyncio.gather(*(batcher(i) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(_run())
+    assert len(results) == 3
+    assert all(isinstance(r, RuntimeError) and str(r) == "boom" for r in results)
@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+from PIL import Image
+
+from app.onnx_model import _load_names, input_size, preprocess
+
+
+class _Input:
+    def __init__(self, shape):
+        self.name = "images"
+        self.shape = shape
+
+
+class _Meta:
+    def __init__(self, metadata):
+        self.custom_metadata_map = metadata
+
+
+class _Session:
+    def __init__(self, shape, metadata=None):
+        self._input = _Input(shape)
+        self._meta = _Meta(metadata or {})
+
+    def get_inputs(self):
+        return [self._input]
+
+    def get_modelmeta(self):
+        return self._meta
+
+
+def test_preprocess_shape_and_range():
+    img = Image.new("RGB", (64, 32), (255, 0, 128))
+    arr = preprocess(img, 16)
+    assert arr.shape == (1, 3, 16, 16)
+    assert arr.dtype == np.float32
+    assert arr.flags["C_CONTIGUOUS"]
+    assert 0.0 <= arr.min() and arr.max() <= 1.0
+    assert np.allclose(arr[0, :, 8, 8], [1.0, 0.0, 128 / 255])
+
+
+def test_input_size_static_and_dynamic():
+    assert input_size(_Session([1, 3, 224, 224])) == 224
+    dynamic = _Session(["batch", 3, "height", "width"], {"imgsz": "[192, 192]"})
+    assert input_size(dynamic) == 192
+
+
+def test_load_names_prefers_names_json(tmp_path):
+    (tmp_path / "names.json").write_text(json.dumps({"0": "Acne", "1": "Eczema"}), encoding="utf-8")
+    names = _load_names(tmp_path / "best.onnx", _Session([1, 3, 224, 224]))
+    assert names == {0: "Acne", 1: "Eczema"}
+
+
+def test_load_names_falls_back_to_metadata(tmp_path):
+    session = _Session([1, 3, 224, 224], {"names": "{0: 'Acne', 1: 'Melanoma'}"})
+    assert _load_names(tmp_path / "best.onnx", session) == {0: "Acne", 1: "Melanoma"}
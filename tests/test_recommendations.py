@@ -0,0 +1,50 @@
+import pytest
+
+from app import recommendations
+
+
+class _Resp:
+    def __init__(self, status_code=200, text=""):
+        self.status_code = status_code
+        self.text = text
+
+
+@pytest.fixture(autouse=True)
+def _clear_practo_cache():
+    recommendations._practo_cache.clear()
+    yield
+    recommendations._practo_cache.clear()
+
+
+def test_fetch_practo_clinics_caches_by_city(monkeypatch):
+    calls = []
+
+    def _fake_get(url, headers=None, timeout=20):
+        calls.append(url)
+        return _Resp(200, '<div class="clinic-name">Derma One</div>')
+
+    monkeypatch.setattr("app.recommendations._PRACTO_SESSION.get", _fake_get)
+
+    clinics, err = recommendations.fetch_practo_clinics("Bangalore")
+    assert err is None
+    assert len(clinics) == 1
+    again, err = recommendations.fetch_practo_clinics("  bangalore ")
+    assert err is None
+    assert again == clinics
+    assert calls == ["https://www.practo.com/bangalore/clinics/skin-clinics"]
+
+
+def test_fetch_practo_clinics_expires_errors_sooner(monkeypatch):
+    calls = []
+
+    def _fake_get(url, headers=None, timeout=20):
+        calls.append(url)
+        return _Resp(503)
+
+    monkeypatch.setattr("app.recommendations._PRACTO_SESSION.get", _fake_get)
+    monkeypatch.setattr("app.recommendations.PRACTO_ERROR_TTL", 0)
+
+    _, err = recommendations.fetch_practo_clinics("Pune")
+    assert err == "Practo responded with status 503."
+    recommendations.fetch_practo_clinics("Pune")
+    assert len(calls) == 2